@@ -2,13 +2,17 @@
 import asyncio
 import contextlib
 import inspect
+import os
 import textwrap
+import uuid
+from pathlib import Path
 from typing import AsyncIterator, Callable, Iterator, Optional
 
 import streamlit as st
 
 
-import ingest
+import index_jobs
+import snapshot
 import search_agent
 import logs
 
@@ -41,14 +45,81 @@ if "repo_owner" not in st.session_state:
     st.session_state.repo_owner = ""
 if "repo_name" not in st.session_state:
     st.session_state.repo_name = ""
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # identifies this session as a waiter on shared builds
+if "build_job" not in st.session_state:
+    st.session_state.build_job = None  # index_jobs.IndexBuildJob this session is waiting on
+if "snapshot_path" not in st.session_state:
+    st.session_state.snapshot_path = os.getenv("INDEX_SNAPSHOT", "")
 
 
 # ---------- Helpers ----------
-def initialize_index(repo_owner: str, repo_name: str):
-    st.write(f"🔧 Initializing index for **{repo_owner}/{repo_name}** …")
-    index = ingest.index_data(repo_owner, repo_name)
-    st.success("✅ Data indexing completed!")
-    return index
+@st.cache_resource(show_spinner=False)
+def get_build_manager():
+    # Shared by all sessions, so concurrent clicks for the same repo join one build.
+    return index_jobs.IndexBuildManager()
+
+def start_index_build(repo_owner: str, repo_name: str):
+    previous = st.session_state.build_job
+    job = get_build_manager().submit(repo_owner, repo_name, waiter=st.session_state.session_id)
+    if previous is not None and previous is not job:
+        previous.release(st.session_state.session_id)
+    st.session_state.build_job = job
+    return job
+
+def cancel_index_build(job):
+    # Only this session stops waiting; the build itself is cancelled once no
+    # other session is waiting on it.
+    job.release(st.session_state.session_id)
+    st.session_state.build_job = None
+    st.session_state.messages.append({"role": "system", "content": f"Index build for {job.repo_owner}/{job.repo_name} was cancelled."})
+
+@st.fragment(run_every=1.0)
+def _render_build_progress():
+    """
+    Poll the session's background build. The current agent keeps answering
+    until the new index is ready, then it is swapped in with one assignment.
+    """
+    job = st.session_state.build_job
+    if job is None:
+        return
+
+    stage, done, total, fraction = job.progress()
+    if job.status in ("queued", "running"):
+        counts = f" ({done:,}/{total:,})" if total else ""
+        unit = " chunks" if stage == "embed" and total else ""
+        st.progress(fraction, text=f"🔧 {job.repo_owner}/{job.repo_name}: {stage}{counts}{unit}")
+        if st.button("Cancel build", use_container_width=True):
+            cancel_index_build(job)
+            st.rerun()
+        return
+
+    st.session_state.build_job = None
+    if job.status == "done":
+        st.session_state.agent = search_agent.init_agent(job.index, job.repo_owner, job.repo_name)
+        st.session_state.repo_owner = job.repo_owner
+        st.session_state.repo_name = job.repo_name
+        st.session_state.index_ready = True
+        st.session_state.messages = [{"role": "system", "content": f"Agent initialized for {job.repo_owner}/{job.repo_name}."}]
+    elif job.status == "failed":
+        st.session_state.messages.append({"role": "system", "content": f"Index build for {job.repo_owner}/{job.repo_name} failed: {job.error}"})
+    else:
+        st.session_state.messages.append({"role": "system", "content": f"Index build for {job.repo_owner}/{job.repo_name} was cancelled."})
+    st.rerun()
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_snapshot_cached(path: str):
+    # One memory-mapped copy per worker process, shared by all sessions. Callers
+    # pass the resolved version directory, so a repointed snapshot symlink loads
+    # the new version instead of hitting the cached old one.
+    return snapshot.load_snapshot(path)
+
+def load_index_snapshot(path: str):
+    st.write(f"📦 Loading index snapshot from **{path}** …")
+    index, manifest = _load_snapshot_cached(str(Path(path).resolve()))
+    params = manifest["build_params"]
+    st.success(f"✅ Loaded {manifest['num_docs']} records for {params['repo_owner']}/{params['repo_name']}!")
+    return index, params["repo_owner"], params["repo_name"]
 
 def initialize_agent(index, repo_owner: str, repo_name: str):
     st.write("🧠 Initializing agent …")
@@ -154,21 +225,36 @@ with st.sidebar:
     st.header("⚙️ Setup")
     st.session_state.repo_owner = st.text_input("Repo owner", value=st.session_state.repo_owner)
     st.session_state.repo_name = st.text_input("Repo name", value=st.session_state.repo_name)
+    st.session_state.snapshot_path = st.text_input(
+        "Index snapshot path (optional)",
+        value=st.session_state.snapshot_path,
+        help="Load a prebuilt snapshot (see snapshot.py) instead of indexing owner/name.",
+    )
     init_clicked = st.button("Initialize / Rebuild Index", type="primary", use_container_width=True)
 
-    if init_clicked:
+    if init_clicked and st.session_state.snapshot_path:
+        with st.spinner("Loading snapshot & initializing the agent…"):
+            try:
+                index, repo_owner, repo_name = load_index_snapshot(st.session_state.snapshot_path)
+            except (OSError, snapshot.SnapshotError) as e:
+                st.error(f"Could not load snapshot: {e}")
+            else:
+                st.session_state.repo_owner = repo_owner
+                st.session_state.repo_name = repo_name
+                st.session_state.agent = initialize_agent(index, repo_owner, repo_name)
+                st.session_state.index_ready = True
+                st.session_state.messages = [{"role": "system", "content": f"Agent initialized for {repo_owner}/{repo_name} from snapshot."}]
+    elif init_clicked:
         if not st.session_state.repo_owner or not st.session_state.repo_name:
             st.error("Please provide both **repo owner** and **repo name**.")
         else:
-            with st.spinner("Indexing & initializing the agent…"):
-                index = initialize_index(st.session_state.repo_owner, st.session_state.repo_name)
-                st.session_state.agent = initialize_agent(index, st.session_state.repo_owner, st.session_state.repo_name)
-                st.session_state.index_ready = True
-                # Optional system message note
-                st.session_state.messages = [{"role": "system", "content": f"Agent initialized for {st.session_state.repo_owner}/{st.session_state.repo_name}."}]
+            start_index_build(st.session_state.repo_owner, st.session_state.repo_name)
+
+    if st.session_state.build_job is not None:
+        _render_build_progress()
 
     st.markdown("---")
-    st.caption("Tip: You can rebuild the index anytime after editing owner and name of the repo.")
+    st.caption("Tip: You can rebuild the index anytime after editing owner and name of the repo. Builds run in the background and the current index keeps answering until the new one is ready.")
 
 
 # ---------- Chat history render ----------
@@ -207,6 +293,8 @@ if prompt:
             with st.spinner("Thinking…"):
                 resp = asyncio.run(_run_agent_async(agent, prompt))
             final_text = _ui_stream_write(_chunk_text_for_streaming(str(resp.output)))
+            usage = resp.usage()
+            st.caption(f"Prompt tokens: {usage.input_tokens:,} across {usage.requests} model call(s)")
             # Persist logs using your helper
             with contextlib.suppress(Exception):
                 logs.log_interaction_to_file(agent, resp.new_messages())
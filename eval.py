@@ -1,14 +1,22 @@
 from pydantic import BaseModel
 from pydantic_ai import Agent
 import json
+import hashlib
+import sqlite3
 from pathlib import Path
 from datetime import datetime
+from collections import defaultdict
 from tqdm import tqdm
-import pandas as pd
 
 
 LOG_DIR = Path('logs')
 LOG_DIR.mkdir(exist_ok=True)
+EVAL_CACHE_PATH = LOG_DIR / 'eval_cache.sqlite'
+EVAL_MODEL = 'gpt-5-nano'
+
+CHECK_NAMES = ['instructions_follow', 'instructions_avoid', 'answer_relevant',
+               'answer_clear', 'answer_citations', 'completeness', 'tool_call_search']
+BREAKDOWN_DIMENSIONS = ['agent_name', 'source', 'day']
 
 
 class EvaluationCheck(BaseModel):
@@ -39,7 +47,7 @@ Checklist:
 Output true/false for each check and provide a short explanation for your judgment.
 """.strip()
 
-def create_eval_agent(model='gpt-5-nano'):
+def create_eval_agent(model=EVAL_MODEL):
     eval_agent = Agent(
     name='eval_agent',
     model=model,
@@ -115,19 +123,16 @@ async def evaluate_log_record(eval_agent, log_record):
     result = await eval_agent.run(user_prompt, output_type=EvaluationChecklist)
     return result.output 
 
-def retreive_log():
-    eval_set = []
+def is_agent_log(log_file):
+    return 'es_agent' in log_file.name or 'es_agent_v2' in log_file.name
 
+def iter_log_files():
     for log_file in LOG_DIR.glob('*.json'):
-        if 'es_agent' not in log_file.name and 'es_agent_v2' not in log_file.name:
-            continue
+        if is_agent_log(log_file):
+            yield log_file
 
-        log_record = load_log_file(log_file)
-        # if log_record['source'] != 'ai-generated':
-        #     continue
-
-        eval_set.append(log_record)
-    return eval_set
+def retreive_log():
+    return [load_log_file(log_file) for log_file in iter_log_files()]
 
 async def evaluate_log():
     eval_results = []
@@ -141,31 +146,129 @@ async def evaluate_log():
     return eval_results
 
 
+def judge_model_name(eval_agent) -> str:
+    model = eval_agent.model
+    return model if isinstance(model, str) else model.model_name
+
+def log_content_hash(raw: bytes, model: str) -> str:
+    """Hash a log file together with the judge model and prompt, so changing either re-judges it."""
+    digest = hashlib.sha256()
+    digest.update(model.encode('utf-8'))
+    digest.update(evaluation_prompt.encode('utf-8'))
+    digest.update(raw)
+    return digest.hexdigest()
+
+
+class EvalCache:
+    """SQLite-backed store of judge verdicts keyed by log content hash."""
+
+    def __init__(self, path=EVAL_CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS evaluations ('
+            'content_hash TEXT PRIMARY KEY, log_file TEXT, evaluated_at TEXT, checklist TEXT)'
+        )
+
+    def get(self, content_hash):
+        row = self.conn.execute(
+            'SELECT checklist FROM evaluations WHERE content_hash = ?', (content_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        return EvaluationChecklist.model_validate_json(row[0])
+
+    def put(self, content_hash, log_file, checklist):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?)',
+            (content_hash, str(log_file), datetime.now().isoformat(), checklist.model_dump_json())
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class PassRateAggregator:
+    """
+    Streaming pass-rate counters, overall and per breakdown dimension.
+
+    Only counts are kept, so memory does not grow with the number of logs.
+    """
+
+    def __init__(self):
+        # (dimension, value) -> check_name -> [passed, total]
+        self.counts = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+
+    def add(self, log_record, eval_result):
+        keys = [('all', 'all')]
+        keys.extend((dim, log_record_dimension(log_record, dim)) for dim in BREAKDOWN_DIMENSIONS)
+
+        for check in eval_result.checklist:
+            for key in keys:
+                counter = self.counts[key][check.check_name]
+                counter[0] += int(bool(check.check_pass))
+                counter[1] += 1
+
+    def pass_rates(self, dimension='all', value='all'):
+        return {
+            name: passed / total
+            for name, (passed, total) in self.counts.get((dimension, value), {}).items()
+            if total
+        }
 
-async def get_eval_means():
+    def breakdown(self, dimension):
+        return {
+            value: self.pass_rates(dim, value)
+            for dim, value in sorted(self.counts)
+            if dim == dimension
+        }
 
-    eval_results = await evaluate_log()
 
-    rows = []
-    for log_record, eval_result in eval_results:
-        messages = log_record['messages']
+def log_record_dimension(log_record, dimension):
+    if dimension == 'day':
+        return str(log_record['messages'][-1]['timestamp'])[:10]
+    return log_record.get(dimension) or 'unknown'
 
-        row = {
-            'file': log_record['log_file'].name,
-            'question': messages[0]['parts'][0]['content'],
-            'answer': messages[-1]['parts'][0]['content'],
-        }
 
-        checks = {c.check_name: c.check_pass for c in eval_result.checklist}
-        row.update(checks)
+async def evaluate_logs_incremental(eval_agent=None, cache_path=EVAL_CACHE_PATH):
+    """
+    Judge every agent log once, reusing cached verdicts, and aggregate pass rates.
 
-        rows.append(row)
-    
-    df_evals = pd.DataFrame(rows)
+    Logs are read, judged and aggregated one at a time; only logs whose content
+    hash is not in the cache are sent to the judge.
+
+    Returns:
+        Tuple of (PassRateAggregator, number of new judge calls).
+    """
+    if eval_agent is None:
+        eval_agent = create_eval_agent()
+    model = judge_model_name(eval_agent)
+
+    aggregator = PassRateAggregator()
+    cache = EvalCache(cache_path)
+    judged = 0
+
+    try:
+        for log_file in tqdm(iter_log_files()):
+            raw = log_file.read_bytes()
+            log_record = json.loads(raw)
+            log_record['log_file'] = log_file
 
-    change_to_bool_cols = ['instructions_follow', 'instructions_avoid', 'answer_relevant', 
-                            'answer_clear','answer_citations', 'completeness', 'tool_call_search']
-    df_evals[change_to_bool_cols] = df_evals[change_to_bool_cols].astype(bool)
-    metrics = df_evals.mean(numeric_only=True)
+            content_hash = log_content_hash(raw, model)
+            eval_result = cache.get(content_hash)
+            if eval_result is None:
+                eval_result = await evaluate_log_record(eval_agent, log_record)
+                cache.put(content_hash, log_file, eval_result)
+                judged += 1
 
-    return metrics
\ No newline at end of file
+            aggregator.add(log_record, eval_result)
+    finally:
+        cache.close()
+
+    return aggregator, judged
+
+
+async def get_eval_means():
+    aggregator, _ = await evaluate_logs_incremental()
+    rates = aggregator.pass_rates()
+    return {name: rates[name] for name in CHECK_NAMES if name in rates}
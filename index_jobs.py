@@ -0,0 +1,166 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ingest
+
+
+STAGES = ['queued', 'download', 'parse', 'chunk', 'embed', 'done']
+# Share of the overall progress bar each stage covers; embedding dominates build time.
+STAGE_WEIGHTS = {'download': 0.15, 'parse': 0.1, 'chunk': 0.05, 'embed': 0.7}
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class IndexBuildJob:
+    """
+    A single background index build for one repository.
+
+    The worker thread reports progress through report(), which is also where a
+    pending cancellation is raised, so a build stops at the next file or chunk.
+
+    Several sessions can wait on the same job. The build is only cancelled once
+    every waiting session has released it.
+    """
+
+    def __init__(self, repo_owner:str, repo_name:str, index_kwargs=None):
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.index_kwargs = index_kwargs or {}
+        self.stage = 'queued'
+        self.done = 0
+        self.total = None
+        self.status = 'queued'  # queued | running | done | failed | cancelled
+        self.index = None
+        self.error = None
+        self.waiters = set()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        return (self.repo_owner, self.repo_name)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def cancelling(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def add_waiter(self, waiter):
+        with self._lock:
+            self.waiters.add(waiter)
+
+    def release(self, waiter):
+        """Stop waiting on the build; cancel it if no other waiter remains."""
+        with self._lock:
+            self.waiters.discard(waiter)
+            if not self.waiters:
+                self._cancel.set()
+
+    def report(self, stage:str, done:int, total=None):
+        if self._cancel.is_set():
+            raise BuildCancelled(f"Build for {self.repo_owner}/{self.repo_name} was cancelled")
+        with self._lock:
+            self.stage, self.done, self.total = stage, done, total
+
+    def progress(self):
+        """
+        Return the current stage, its counters and the overall completed fraction.
+
+        Returns:
+            Tuple of (stage, done, total, fraction between 0 and 1).
+        """
+        with self._lock:
+            stage, done, total = self.stage, self.done, self.total
+
+        if self.status == 'done':
+            return stage, done, total, 1.0
+
+        fraction = 0.0
+        for name, weight in STAGE_WEIGHTS.items():
+            if name == stage:
+                if total:
+                    fraction += weight * min(done / total, 1.0)
+                break
+            if STAGES.index(name) < STAGES.index(stage):
+                fraction += weight
+        return stage, done, total, fraction
+
+    def run(self):
+        if self._cancel.is_set():
+            self.status = 'cancelled'
+            return
+        self.status = 'running'
+        try:
+            self.index = ingest.index_data(
+                self.repo_owner, self.repo_name, progress=self.report, **self.index_kwargs
+            )
+            # Set directly: report() would raise for a cancel that arrived after embedding.
+            with self._lock:
+                self.stage, self.done, self.total = 'done', 1, 1
+            self.status = 'done'
+        except BuildCancelled:
+            self.status = 'cancelled'
+        except Exception as e:
+            self.error = e
+            self.status = 'failed'
+        finally:
+            # Never leave a job running: waiters poll until it is finished.
+            if not self.finished:
+                self.status = 'failed'
+
+
+class IndexBuildManager:
+    """
+    Run index builds on worker threads, with at most one active build per repository.
+
+    Submitting a repository whose build is still queued or running returns the
+    existing job instead of starting a duplicate, and registers the caller as a
+    waiter so that one caller cancelling does not stop the build for the others.
+
+    Only in-flight builds are tracked. A finished job is forgotten, so its index
+    lives only as long as the callers holding the job.
+    """
+
+    def __init__(self, max_workers=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='index-build')
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_owner:str, repo_name:str, waiter=None, **index_kwargs) -> IndexBuildJob:
+        with self._lock:
+            job = self.jobs.get((repo_owner, repo_name))
+            if job is None or job.finished or job.cancelling:
+                job = IndexBuildJob(repo_owner, repo_name, index_kwargs)
+                self.jobs[job.key] = job
+                future = self.executor.submit(job.run)
+                future.add_done_callback(lambda _, job=job: self._forget(job))
+            if waiter is not None:
+                job.add_waiter(waiter)
+            return job
+
+    def _forget(self, job:IndexBuildJob):
+        with self._lock:
+            # A newer job may already have replaced a cancelling one.
+            if self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+
+    def get(self, repo_owner:str, repo_name:str):
+        with self._lock:
+            return self.jobs.get((repo_owner, repo_name))
+
+    def cancel(self, repo_owner:str, repo_name:str, waiter=None):
+        job = self.get(repo_owner, repo_name)
+        if job is not None:
+            if waiter is None:
+                job.cancel()
+            else:
+                job.release(waiter)
+        return job
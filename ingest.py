@@ -10,51 +10,62 @@ from tqdm.auto import tqdm
 import numpy as np
 
 
-embedding_model = SentenceTransformer('multi-qa-distilbert-cos-v1')
+EMBEDDING_MODEL_NAME = 'multi-qa-distilbert-cos-v1'
+embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 v_index = VectorSearch(keyword_fields = [])
 
 
+def _no_progress(stage:str, done:int, total=None):
+    pass
 
-def read_repo_data(repo_owner:str, repo_name:str) -> list:
+
+def read_repo_data(repo_owner:str, repo_name:str, progress=_no_progress) -> list:
     """
     Download and parse all markdown files from a GitHub repository.
     
     Args:
         repo_owner: GitHub username or organization
         repo_name: Repository name
+        progress: Callback progress(stage, done, total) for the 'download'
+            (bytes) and 'parse' (files) stages
     
     Returns:
         List of dictionaries containing file content and metadata
     """
     prefix = 'https://codeload.github.com' 
     url = f'{prefix}/{repo_owner}/{repo_name}/zip/refs/heads/main'
-    resp = requests.get(url)
-    
-    if resp.status_code != 200:
-        raise Exception(f"Failed to download repository: {resp.status_code}")
+    buffer = io.BytesIO()
+    with requests.get(url, stream=True) as resp:
+        if resp.status_code != 200:
+            raise Exception(f"Failed to download repository: {resp.status_code}")
 
-    repository_data = []
+        total_bytes = int(resp.headers.get('content-length', 0)) or None
+        progress('download', 0, total_bytes)
+        for block in resp.iter_content(chunk_size=1 << 20):
+            buffer.write(block)
+            progress('download', buffer.tell(), total_bytes)
 
-    zf = zipfile.ZipFile(io.BytesIO(resp.content))
-    
-    for file_info in zf.infolist():
-        filename = file_info.filename.lower()
+    repository_data = []
 
-        if not filename.endswith(('.md', '.mdx')):
-            continue
+    with zipfile.ZipFile(buffer) as zf:
+        md_files = [f for f in zf.infolist() if f.filename.lower().endswith(('.md', '.mdx'))]
     
-        try:
-            with zf.open(file_info) as f_in:
-                content = f_in.read().decode('utf-8', errors='ignore')
-                post = frontmatter.loads(content)
-                data = post.to_dict()
-                data['filename'] = filename
-                repository_data.append(data)
-        except Exception as e:
-            print(f"Error processing {filename}: {e}")
-            continue
+        for i, file_info in enumerate(md_files):
+            filename = file_info.filename.lower()
+            progress('parse', i, len(md_files))
     
-    zf.close()
+            try:
+                with zf.open(file_info) as f_in:
+                    content = f_in.read().decode('utf-8', errors='ignore')
+                    post = frontmatter.loads(content)
+                    data = post.to_dict()
+                    data['filename'] = filename
+                    repository_data.append(data)
+            except Exception as e:
+                print(f"Error processing {filename}: {e}")
+                continue
+
+    progress('parse', len(md_files), len(md_files))
 
     
     return repository_data   
@@ -87,19 +98,25 @@ def chunk_documents(docs:list, size=2000, step=1000):
 
 
 
-def create_doc_embeddings(chunks:list):
+def create_doc_embeddings(chunks:list, progress=_no_progress):
     embeddings = []
 
-    for d in tqdm(chunks):
+    for i, d in enumerate(tqdm(chunks)):
+        progress('embed', i, len(chunks))
         v = embedding_model.encode(d['content'])
         embeddings.append(v)
+    progress('embed', len(chunks), len(chunks))
 
     return np.array(embeddings)
 
 
-def create_vector_index(chunks:list):
-    emb_array = create_doc_embeddings(chunks)
-    return v_index.fit(emb_array, chunks)
+def create_vector_index(chunks:list, progress=_no_progress):
+    global v_index
+    emb_array = create_doc_embeddings(chunks, progress)
+    # Fit a fresh index rather than refitting the shared one, so an index that
+    # is already serving queries is never modified mid-build.
+    v_index = VectorSearch(keyword_fields = []).fit(emb_array, chunks)
+    return v_index
 
 
 
@@ -108,8 +125,8 @@ def text_embedding_search(query:str):
     return v_index.search(query_embedding, num_results=5)
 
 
-def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=None):
-    docs = read_repo_data(repo_owner, repo_name)
+def prepare_docs(repo_owner, repo_name, filter=None, chunk=False, chunking_params=None, progress=_no_progress):
+    docs = read_repo_data(repo_owner, repo_name, progress=progress)
 
     if filter is not None:
         docs = [doc for doc in docs if filter(doc)]
@@ -117,9 +134,18 @@ def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=
     if chunk:
         if chunking_params is None:
             chunking_params = {'size': 2000, 'step': 1000}
+        progress('chunk', 0, len(docs))
         docs = chunk_documents(docs, **chunking_params)
+        progress('chunk', len(docs), len(docs))
+
+    return docs
+
+
+def index_data(repo_owner, repo_name, filter=None, chunk=False, chunking_params=None, progress=_no_progress):
+    docs = prepare_docs(repo_owner, repo_name, filter=filter, chunk=chunk,
+                        chunking_params=chunking_params, progress=progress)
     
-    vector_index = create_vector_index(docs)
+    vector_index = create_vector_index(docs, progress)
     
     return vector_index
     
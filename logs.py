@@ -11,6 +11,15 @@ LOG_DIR = Path(os.getenv('LOGS_DIRECTORY', 'logs'))
 LOG_DIR.mkdir(exist_ok=True)
 
 
+def prompt_tokens_per_turn(dict_messages):
+    """Return the prompt (input) tokens of every model request in a logged conversation."""
+    return [
+        m['usage']['input_tokens']
+        for m in dict_messages
+        if m.get('kind') == 'response' and m.get('usage')
+    ]
+
+
 def log_entry(agent, messages, source="user"):
     tools = []
 
@@ -18,6 +27,7 @@ def log_entry(agent, messages, source="user"):
         tools.extend(ts.tools.keys())
 
     dict_messages = ModelMessagesTypeAdapter.dump_python(messages)
+    prompt_tokens = prompt_tokens_per_turn(dict_messages)
 
     return {
         "agent_name": agent.name,
@@ -26,6 +36,8 @@ def log_entry(agent, messages, source="user"):
         "model": agent.model.model_name,
         "tools": tools,
         "messages": dict_messages,
+        "prompt_tokens": sum(prompt_tokens),
+        "prompt_tokens_per_turn": prompt_tokens,
         "source": source
     }
 
@@ -50,3 +62,41 @@ def log_interaction_to_file(agent, messages, source='user'):
         json.dump(entry, f_out, indent=2, default=serializer)
 
     return filepath
+
+
+def summarize_prompt_tokens(log_dir=LOG_DIR):
+    """
+    Report prompt tokens per model turn across all logged interactions.
+
+    Args:
+        log_dir: Directory containing the JSON interaction logs.
+
+    Returns:
+        Dictionary with the number of interactions and turns, and the mean
+        prompt tokens per turn and per interaction.
+    """
+    interactions = 0
+    turns = 0
+    total = 0
+
+    for log_file in Path(log_dir).glob('*.json'):
+        with log_file.open('r', encoding='utf-8') as f_in:
+            entry = json.load(f_in)
+        per_turn = prompt_tokens_per_turn(entry.get('messages', []))
+        if not per_turn:
+            continue
+        interactions += 1
+        turns += len(per_turn)
+        total += sum(per_turn)
+
+    return {
+        "interactions": interactions,
+        "turns": turns,
+        "mean_prompt_tokens_per_turn": total / turns if turns else 0.0,
+        "mean_prompt_tokens_per_interaction": total / interactions if interactions else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    for key, value in summarize_prompt_tokens().items():
+        print(f"{key}: {value:,.1f}" if isinstance(value, float) else f"{key}: {value}")
@@ -1,5 +1,7 @@
 import ingest
+import snapshot
 import search_agent 
+import search_tools
 import logs
 import argparse
 
@@ -15,18 +17,33 @@ def initialize_index(repo_owner:str, repo_name:str):
     print("Data indexing completed successfully!")
     return index
 
-def initialize_agent(index, repo_owner:str, repo_name:str):
+def load_index_snapshot(path:str):
+    print(f"Loading index snapshot from {path}...")
+    index, manifest = snapshot.load_snapshot(path)
+    params = manifest['build_params']
+    print(f"Loaded {manifest['num_docs']} records for {params['repo_owner']}/{params['repo_name']}")
+    return index, params['repo_owner'], params['repo_name']
+
+def initialize_agent(index, repo_owner:str, repo_name:str, num_results:int=5, reranker=None):
     print("Initializing search agent...")
-    agent = search_agent.init_agent(index, repo_owner, repo_name)
+    agent = search_agent.init_agent(index, repo_owner, repo_name, num_results=num_results, reranker=reranker)
     print("Agent initialized successfully!")
     return agent
 
 
 def main(params):
-    repo_owner = params.repo_owner
-    repo_name = params.repo_name
-    index = initialize_index(repo_owner=repo_owner, repo_name=repo_name)
-    agent = initialize_agent(index, repo_owner=repo_owner, repo_name=repo_name)
+    if params.snapshot:
+        index, repo_owner, repo_name = load_index_snapshot(params.snapshot)
+    else:
+        repo_owner = params.repo_owner
+        repo_name = params.repo_name
+        index = initialize_index(repo_owner=repo_owner, repo_name=repo_name)
+    reranker = None
+    if params.rerank:
+        print("Loading cross-encoder re-ranker...")
+        reranker = search_tools.CrossEncoderReranker(budget_ms=params.rerank_budget_ms)
+    agent = initialize_agent(index, repo_owner=repo_owner, repo_name=repo_name,
+                             num_results=params.num_results, reranker=reranker)
     print("\nReady to answer your questions!")
     print("Type 'stop' to exit the program.\n")
 
@@ -40,7 +57,9 @@ def main(params):
         response = asyncio.run(agent.run(user_prompt=question))
         logs.log_interaction_to_file(agent, response.new_messages())
 
+        usage = response.usage()
         print("\nResponse:\n", response.output)
+        print(f"\nPrompt tokens: {usage.input_tokens} across {usage.requests} model call(s)")
         print("\n" + "="*50 + "\n")
 
 
@@ -48,6 +67,13 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Create an agent that is grounded with data from a given repository. Embeddings, created from texts, are stored in vectors and later retrieved when a question is posed to the agent.')
     parser.add_argument('--repo_owner', help='user id of repository owner')
     parser.add_argument('--repo_name', help='name of repository')
+    parser.add_argument('--snapshot', help='path to a prebuilt index snapshot (see snapshot.py); replaces --repo_owner/--repo_name')
+    parser.add_argument('--num_results', type=int, default=5, help='number of search results returned to the agent per tool call')
+
+    parser.add_argument('--rerank', action='store_true', help='re-rank search candidates with a cross-encoder')
+    parser.add_argument('--rerank_budget_ms', type=float, default=250, help='latency budget for re-ranking; vector order is used when exceeded')
 
     args = parser.parse_args()
+    if not args.snapshot and not (args.repo_owner and args.repo_name):
+        parser.error('provide either --snapshot or both --repo_owner and --repo_name')
     main(args)
\ No newline at end of file
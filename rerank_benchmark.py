@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter
+from tqdm import tqdm
+
+import ingest
+import snapshot
+import search_agent
+import search_tools
+
+
+LOG_DIR = Path('logs')
+
+
+def count_search_calls(dict_messages) -> int:
+    return sum(
+        1
+        for m in dict_messages
+        for part in m['parts']
+        if part.get('part_kind') == 'tool-call' and part.get('tool_name') == 'search'
+    )
+
+
+def logged_search_queries(dict_messages) -> list:
+    queries = []
+    for m in dict_messages:
+        for part in m['parts']:
+            if part.get('part_kind') != 'tool-call' or part.get('tool_name') != 'search':
+                continue
+            args = part['args']
+            if isinstance(args, str):
+                args = json.loads(args)
+            queries.append(args['query'])
+    return queries
+
+
+def load_logged_questions(log_dir=LOG_DIR):
+    """
+    Collect the questions from logged interactions, with the number of search
+    calls and the search queries the logged agent made.
+
+    Returns:
+        List of dictionaries with 'question', 'search_calls' and 'queries'.
+    """
+    records = []
+    seen = set()
+    for log_file in sorted(Path(log_dir).glob('*.json')):
+        with log_file.open('r', encoding='utf-8') as f_in:
+            messages = json.load(f_in).get('messages', [])
+        if not messages:
+            continue
+        question = messages[0]['parts'][0]['content']
+        if question in seen:
+            continue
+        seen.add(question)
+        records.append({
+            'question': question,
+            'search_calls': count_search_calls(messages),
+            'queries': logged_search_queries(messages),
+        })
+    return records
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def benchmark_retrieval(index, queries, reranker, num_candidates):
+    """Time SearchTool.search with and without re-ranking on the logged search queries."""
+    plain = search_tools.SearchTool(index=index)
+    reranked = search_tools.SearchTool(index=index, reranker=reranker, num_candidates=num_candidates)
+    timings = {'vector': [], 'rerank': []}
+    if not queries:
+        return timings, 0
+
+    # Warm up both models so the first query does not include lazy initialisation.
+    reranked.search(queries[0])
+
+    fallbacks = 0
+    for query in tqdm(queries):
+        for name, tool in (('vector', plain), ('rerank', reranked)):
+            started = time.perf_counter()
+            tool.search(query)
+            timings[name].append((time.perf_counter() - started) * 1000)
+        fallbacks += int(reranker.last_fallback)
+
+    return timings, fallbacks
+
+
+async def benchmark_agent(index, repo_owner, repo_name, questions, reranker, num_candidates):
+    """Answer each question with and without re-ranking and count search calls per answer."""
+    agents = {
+        'vector': search_agent.init_agent(index, repo_owner, repo_name),
+        'rerank': search_agent.init_agent(index, repo_owner, repo_name, reranker=reranker,
+                                          num_candidates=num_candidates),
+    }
+
+    calls = {'vector': [], 'rerank': []}
+    for question in tqdm(questions):
+        for name, agent in agents.items():
+            result = await agent.run(user_prompt=question)
+            dict_messages = ModelMessagesTypeAdapter.dump_python(result.new_messages())
+            calls[name].append(count_search_calls(dict_messages))
+    return calls
+
+
+def main(params):
+    if params.snapshot:
+        index, manifest = snapshot.load_snapshot(params.snapshot)
+        repo_owner = manifest['build_params']['repo_owner']
+        repo_name = manifest['build_params']['repo_name']
+    else:
+        repo_owner, repo_name = params.repo_owner, params.repo_name
+        index = ingest.index_data(repo_owner, repo_name)
+
+    records = load_logged_questions()
+    if params.limit:
+        records = records[:params.limit]
+    queries = [q for r in records for q in r['queries']]
+    if not records:
+        print(f"No logged questions found in {LOG_DIR}/; nothing to benchmark.")
+        return
+
+    reranker = search_tools.CrossEncoderReranker(budget_ms=params.budget_ms)
+
+    print(f"Questions: {len(records)}, logged search queries: {len(queries)}")
+    print(f"Logged search calls per answer: {statistics.mean(r['search_calls'] for r in records):.2f}")
+
+    timings, fallbacks = benchmark_retrieval(index, queries, reranker, params.num_candidates)
+    if queries:
+        added = [r - v for r, v in zip(timings['rerank'], timings['vector'])]
+        print("\nRetrieval latency (ms)")
+        for name, values in timings.items():
+            print(f"  {name:7s} mean {statistics.mean(values):7.1f}  p50 {percentile(values, 0.5):7.1f}  p95 {percentile(values, 0.95):7.1f}")
+        print(f"  added   mean {statistics.mean(added):7.1f}  p95 {percentile(added, 0.95):7.1f}")
+        print(f"  budget fallbacks: {fallbacks}/{len(queries)}")
+    else:
+        print("\nNo search calls in the selected logs; skipping the retrieval latency benchmark.")
+
+    if params.skip_agent:
+        return
+
+    calls = asyncio.run(benchmark_agent(index, repo_owner, repo_name, [r['question'] for r in records],
+                                        reranker, params.num_candidates))
+    vector_mean = statistics.mean(calls['vector'])
+    rerank_mean = statistics.mean(calls['rerank'])
+    print("\nSearch tool calls per answer")
+    print(f"  vector  {vector_mean:.2f}")
+    print(f"  rerank  {rerank_mean:.2f}")
+    if vector_mean:
+        print(f"  reduction {100 * (vector_mean - rerank_mean) / vector_mean:.1f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare vector-only search with cross-encoder re-ranking on the questions in logs/: added retrieval latency and search tool calls per answer.')
+    parser.add_argument('--repo_owner', default='elastic', help='user id of repository owner')
+    parser.add_argument('--repo_name', default='elasticsearch', help='name of repository')
+    parser.add_argument('--snapshot', help='path to a prebuilt index snapshot; replaces --repo_owner/--repo_name')
+    parser.add_argument('--budget_ms', type=float, default=250, help='re-ranking latency budget')
+    parser.add_argument('--num_candidates', type=int, default=20, help='vector hits passed to the re-ranker')
+    parser.add_argument('--limit', type=int, help='only use the first N logged questions')
+    parser.add_argument('--skip_agent', action='store_true', help='only measure retrieval latency; no LLM calls')
+
+    args = parser.parse_args()
+    main(args)
@@ -18,10 +18,12 @@ Format: [LINK TITLE](FULL_GITHUB_LINK)
 If the search doesn't return relevant results, let the user know and provide general guidance.
 """
 
-def init_agent(index, repo_owner, repo_name, agent_name='es_agent'):
+def init_agent(index, repo_owner, repo_name, agent_name='es_agent', num_results=5, max_tokens=200, reranker=None,
+               num_candidates=20):
     system_prompt = SYSTEM_PROMPT_TEMPLATE.format(repo_owner=repo_owner, repo_name=repo_name)
 
-    search_tool = search_tools.SearchTool(index=index)
+    search_tool = search_tools.SearchTool(index=index, num_results=num_results, max_tokens=max_tokens,
+                                          reranker=reranker, num_candidates=num_candidates)
 
     agent = Agent(
         name=agent_name,
@@ -1,13 +1,212 @@
+import re
+import time
 from typing import List, Any
-from sentence_transformers import SentenceTransformer
+from sentence_transformers import CrossEncoder, SentenceTransformer
 
 embedding_model = SentenceTransformer('multi-qa-distilbert-cos-v1')
 
+# Only the fields the agent needs to answer and cite a source are sent back.
+CITATION_FIELDS = ('filename', 'content')
+CHARS_PER_TOKEN = 4
+
+_word_re = re.compile(r'\w+')
+
+
+def _overlaps(hit: dict, kept: dict) -> bool:
+    if hit.get('filename') != kept.get('filename'):
+        return False
+    if 'start' not in hit or 'start' not in kept:
+        # Whole documents: the same file is the same content.
+        return True
+    hit_end = hit['start'] + len(hit.get('content', ''))
+    kept_end = kept['start'] + len(kept.get('content', ''))
+    return hit['start'] < kept_end and kept['start'] < hit_end
+
+
+def dedup_results(results: list) -> list:
+    """
+    Drop hits whose window overlaps a better-ranked hit from the same file.
+
+    Args:
+        results: Search hits ordered from best to worst.
+
+    Returns:
+        The hits that do not overlap any earlier hit, in the original order.
+    """
+    kept = []
+    for hit in results:
+        if any(_overlaps(hit, k) for k in kept):
+            continue
+        kept.append(hit)
+    return kept
+
+
+def best_span(text: str, query: str, max_tokens: int) -> str:
+    """
+    Trim text to the window of at most max_tokens that contains the most query terms.
+
+    Args:
+        text: The text to trim.
+        query: The search query whose terms are matched against the text.
+        max_tokens: Token budget for the returned span.
+
+    Returns:
+        The best-matching span, with '...' marking cut-off ends.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    terms = {t for t in _word_re.findall(query.lower()) if len(t) > 2}
+    hits = [m.start() for m in _word_re.finditer(text.lower()) if m.group() in terms]
+
+    best_start, best_count = 0, -1
+    right = 0
+    for left, start in enumerate(hits):
+        while right < len(hits) and hits[right] < start + max_chars:
+            right += 1
+        if right - left > best_count:
+            best_start, best_count = start, right - left
+
+    # Centre the matches in the window rather than starting on the first one.
+    if best_count > 0:
+        best_start = max(0, best_start - max_chars // 4)
+    best_start = min(best_start, len(text) - max_chars)
+
+    # Snap to whitespace so the span does not start or end mid-word.
+    end = best_start + max_chars
+    if best_start > 0:
+        space = text.find(' ', best_start, end)
+        if space != -1:
+            best_start = space + 1
+    if end < len(text):
+        space = text.rfind(' ', best_start, end)
+        if space != -1:
+            end = space
+
+    span = text[best_start:end]
+    if best_start > 0:
+        span = '...' + span
+    if end < len(text):
+        span = span + '...'
+    return span
+
+
+def compact_results(results: list, query: str, num_results: int = 5, max_tokens: int = 200) -> list:
+    """
+    Shape raw search hits into a compact tool result for the LLM.
+
+    Args:
+        results: Search hits ordered from best to worst.
+        query: The search query, used to pick the best-matching span of each hit.
+        num_results: Maximum number of hits to return.
+        max_tokens: Token budget for the content of each hit.
+
+    Returns:
+        Deduplicated hits containing only citation fields, with trimmed content.
+    """
+    compact = []
+    for hit in dedup_results(results)[:num_results]:
+        item = {k: hit[k] for k in CITATION_FIELDS if k in hit}
+        item['content'] = best_span(hit.get('content', ''), query, max_tokens)
+        compact.append(item)
+    return compact
+
+
+class CrossEncoderReranker:
+    """
+    Re-score search candidates with a small cross-encoder on CPU.
+
+    A running estimate of the cost per (query, document) pair is kept across
+    calls. Re-ranking is skipped up front when the estimate says the candidates
+    cannot be scored within budget_ms, and abandoned as soon as the elapsed time
+    (or the expected time to score the remaining candidates) exceeds it. In both
+    cases the candidates keep their vector order.
+
+    Every probe_every skipped calls, the first probe_size candidates are scored
+    anyway to re-measure the cost, so an estimate inflated by a slow spell
+    recovers instead of disabling re-ranking for good.
+    """
+
+    def __init__(self, model_name='cross-encoder/ms-marco-MiniLM-L-6-v2', budget_ms=250,
+                 batch_size=16, max_chars=1000, smoothing=0.3, probe_every=5, probe_size=2):
+        self.model = CrossEncoder(model_name, device='cpu')
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.smoothing = smoothing
+        self.probe_every = probe_every
+        self.probe_size = probe_size
+        self.pair_ms = None
+        self.skipped = 0
+        self.last_latency_ms = 0.0
+        self.last_fallback = False
+
+        # Warm up so the first estimate does not include lazy initialisation.
+        self._score([('warm up', 'warm up')] * batch_size)
+
+    def _score(self, pairs: list) -> list:
+        started = time.perf_counter()
+        scores = [float(s) for s in self.model.predict(pairs, batch_size=self.batch_size)]
+        pair_ms = (time.perf_counter() - started) * 1000 / len(pairs)
+        if self.pair_ms is None:
+            self.pair_ms = pair_ms
+        else:
+            self.pair_ms += self.smoothing * (pair_ms - self.pair_ms)
+        return scores
+
+    def _pairs(self, query: str, results: list) -> list:
+        return [(query, r.get('content', '')[:self.max_chars]) for r in results]
+
+    def _fallback(self, results: list, started: float) -> list:
+        self.last_fallback = True
+        self.last_latency_ms = (time.perf_counter() - started) * 1000
+        return results
+
+    def rerank(self, query: str, results: list) -> list:
+        """
+        Reorder results by cross-encoder score, within the latency budget.
+
+        Args:
+            query: The search query.
+            results: Candidate hits in vector-search order.
+
+        Returns:
+            The hits sorted by cross-encoder score, or unchanged on fallback.
+        """
+        started = time.perf_counter()
+        scores = []
+        self.last_fallback = False
+
+        if self.pair_ms * len(results) > self.budget_ms:
+            self.skipped += 1
+            if self.skipped < self.probe_every:
+                return self._fallback(results, started)
+            # Re-measure on a few candidates; if the new estimate fits, carry on.
+            scores.extend(self._score(self._pairs(query, results[:self.probe_size])))
+        self.skipped = 0
+
+        while len(scores) < len(results):
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms + self.pair_ms * (len(results) - len(scores)) > self.budget_ms:
+                return self._fallback(results, started)
+            batch = results[len(scores):len(scores) + self.batch_size]
+            scores.extend(self._score(self._pairs(query, batch)))
+            if (time.perf_counter() - started) * 1000 > self.budget_ms:
+                return self._fallback(results, started)
+
+        self.last_latency_ms = (time.perf_counter() - started) * 1000
+        order = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)
+        return [results[i] for i in order]
 
 
 class SearchTool:
-    def __init__(self, index):
+    def __init__(self, index, num_results=5, max_tokens=200, reranker=None, num_candidates=20):
         self.index=index
+        self.num_results=num_results
+        self.max_tokens=max_tokens
+        self.reranker=reranker
+        self.num_candidates=num_candidates
 
     def search(self, query: str) -> List[Any]:
         """
@@ -17,7 +216,14 @@ class SearchTool:
             query (str): The search query string.
 
         Returns:
-            List[Any]: A list of up to 5 search results returned by the index.
+            List[Any]: A list of search results with the source filename and the
+            most relevant excerpt of its content.
         """
         query_embedding = embedding_model.encode(query)
-        return self.index.search(query_embedding, num_results=5)
\ No newline at end of file
+        if self.reranker is None:
+            # Over-fetch so that dropping overlapping windows still leaves enough hits.
+            results = self.index.search(query_embedding, num_results=self.num_results * 2)
+        else:
+            candidates = self.index.search(query_embedding, num_results=self.num_candidates)
+            results = self.reranker.rerank(query, dedup_results(candidates))
+        return compact_results(results, query, self.num_results, self.max_tokens)
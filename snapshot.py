@@ -0,0 +1,250 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+
+import numpy as np
+import sentence_transformers
+
+import ingest
+
+
+SNAPSHOT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+EMBEDDINGS_FILE = 'embeddings.npy'
+DOCS_FILE = 'docs.json'
+FINGERPRINT_PROBE = 'github assistant embedding fingerprint'
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotIndex:
+    """
+    Top-k cosine search over L2-normalised embeddings.
+
+    Unlike minsearch.VectorSearch, search never copies or re-normalises the
+    matrix, so a memory-mapped matrix stays shared between processes.
+    """
+
+    def __init__(self, embeddings, docs:list):
+        self.embeddings = embeddings
+        self.docs = docs
+
+    def search(self, query_vector, num_results=10):
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm > 0:
+            query_vector = query_vector / norm
+
+        scores = self.embeddings @ query_vector
+        num_results = min(num_results, len(scores))
+        if num_results <= 0:
+            return []
+        top = np.argpartition(-scores, num_results - 1)[:num_results]
+        top = top[np.argsort(-scores[top])]
+        return [self.docs[i] for i in top]
+
+
+def file_sha256(path, block_size=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f_in:
+        for block in iter(lambda: f_in.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_fingerprint() -> dict:
+    """
+    Describe the embedding model so a snapshot can be matched to the query encoder.
+
+    Returns:
+        Dictionary with the model name, library version, embedding dimension and
+        the embedding of a fixed probe sentence.
+    """
+    probe = ingest.embedding_model.encode(FINGERPRINT_PROBE)
+    return {
+        'model_name': ingest.EMBEDDING_MODEL_NAME,
+        'sentence_transformers': sentence_transformers.__version__,
+        'dimension': int(probe.shape[0]),
+        'probe': [round(float(x), 6) for x in probe],
+    }
+
+
+def check_fingerprint(expected: dict):
+    actual = model_fingerprint()
+    if expected['model_name'] != actual['model_name'] or expected['dimension'] != actual['dimension']:
+        raise SnapshotError(
+            f"Snapshot was built with {expected['model_name']} ({expected['dimension']}d), "
+            f"but the query model is {actual['model_name']} ({actual['dimension']}d)"
+        )
+    if not np.allclose(expected['probe'], actual['probe'], atol=1e-4):
+        raise SnapshotError("Snapshot embeddings do not match the local embedding model weights")
+
+
+def write_snapshot(path, embeddings, docs:list, build_params:dict) -> Path:
+    """
+    Write an index snapshot to a directory.
+
+    Each snapshot is written to a new versioned directory next to path, and path
+    is a symlink that is atomically swapped to it, so readers see either the old
+    or the new snapshot and never a missing or half-written one. The previous
+    version is kept for readers still loading it; older ones are removed.
+
+    Embeddings are stored L2-normalised as float32.
+
+    Args:
+        path: Snapshot path (a symlink to the current version).
+        embeddings: Embedding matrix with one row per document.
+        docs: Document (or chunk) records, in the same order as the embeddings.
+        build_params: Parameters used to build the index, e.g. repo and chunking.
+
+    Returns:
+        Path of the written snapshot.
+    """
+    path = Path(path)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or embeddings.shape[0] != len(docs):
+        raise SnapshotError(f"Expected {len(docs)} embedding rows, got shape {embeddings.shape}")
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings = np.ascontiguousarray(embeddings / np.maximum(norms, 1e-12), dtype=np.float32)
+
+    version = datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')
+    tmp_path = path.with_name(f'{path.name}.v{version}')
+    tmp_path.mkdir(parents=True)
+
+    np.save(tmp_path / EMBEDDINGS_FILE, embeddings)
+    with (tmp_path / DOCS_FILE).open('w', encoding='utf-8') as f_out:
+        # Frontmatter can contain dates and other YAML types.
+        json.dump(docs, f_out, default=str)
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'model': model_fingerprint(),
+        'build_params': build_params,
+        'num_docs': len(docs),
+        'shape': list(embeddings.shape),
+        'dtype': str(embeddings.dtype),
+        'normalized': True,
+        'checksums': {
+            name: file_sha256(tmp_path / name) for name in (EMBEDDINGS_FILE, DOCS_FILE)
+        },
+    }
+    with (tmp_path / MANIFEST_FILE).open('w', encoding='utf-8') as f_out:
+        json.dump(manifest, f_out, indent=2)
+
+    if path.exists() and not path.is_symlink():
+        # A plain directory cannot be replaced atomically by a symlink; move it aside.
+        os.replace(path, path.with_name(f'{path.name}.v0-legacy'))
+
+    link_tmp = path.with_name(f'{path.name}.link-{version}')
+    os.symlink(tmp_path.name, link_tmp)
+    os.replace(link_tmp, path)
+
+    _remove_old_versions(path, keep=2)
+    return path
+
+
+def _remove_old_versions(path:Path, keep:int):
+    versions = sorted(path.parent.glob(f'{path.name}.v*'))
+    current = path.resolve()
+    for old in versions[:-keep]:
+        if old.resolve() != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def read_manifest(path) -> dict:
+    manifest_path = Path(path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise SnapshotError(f"No snapshot manifest found at {manifest_path}")
+    with manifest_path.open('r', encoding='utf-8') as f_in:
+        manifest = json.load(f_in)
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {manifest.get('version')}")
+    return manifest
+
+
+def load_snapshot(path, verify=True):
+    """
+    Load an index snapshot written by write_snapshot.
+
+    The embedding matrix is memory-mapped read-only, so processes on the same
+    host loading the same snapshot share its pages.
+
+    Args:
+        path: Snapshot directory.
+        verify: Check file checksums and the embedding model fingerprint.
+
+    Returns:
+        Tuple of (vector index, manifest).
+    """
+    # Resolve the symlink once so every file comes from the same version.
+    path = Path(path).resolve()
+    manifest = read_manifest(path)
+
+    if verify:
+        for name, expected in manifest['checksums'].items():
+            actual = file_sha256(path / name)
+            if actual != expected:
+                raise SnapshotError(f"Checksum mismatch for {path / name}")
+        check_fingerprint(manifest['model'])
+
+    embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode='r')
+    if list(embeddings.shape) != manifest['shape'] or embeddings.dtype != np.float32:
+        raise SnapshotError(
+            f"Embeddings {embeddings.shape} {embeddings.dtype} do not match manifest {manifest['shape']} {manifest['dtype']}"
+        )
+
+    with (path / DOCS_FILE).open('r', encoding='utf-8') as f_in:
+        docs = json.load(f_in)
+
+    return SnapshotIndex(embeddings, docs), manifest
+
+
+def build_snapshot(repo_owner:str, repo_name:str, path, chunk=False, chunking_params=None) -> Path:
+    """
+    Download, embed and write a snapshot for a GitHub repository.
+
+    Args:
+        repo_owner: GitHub username or organization
+        repo_name: Repository name
+        path: Destination directory.
+        chunk: Split documents with a sliding window before embedding.
+        chunking_params: Sliding window parameters, e.g. {'size': 2000, 'step': 1000}.
+
+    Returns:
+        Path of the written snapshot.
+    """
+    if chunk and chunking_params is None:
+        chunking_params = {'size': 2000, 'step': 1000}
+
+    docs = ingest.prepare_docs(repo_owner, repo_name, chunk=chunk, chunking_params=chunking_params)
+    embeddings = ingest.create_doc_embeddings(docs)
+
+    build_params = {
+        'repo_owner': repo_owner,
+        'repo_name': repo_name,
+        'chunk': chunk,
+        'chunking_params': chunking_params,
+    }
+    return write_snapshot(path, embeddings, docs, build_params)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a portable index snapshot for a repository, so workers can load it instead of indexing the repository themselves.')
+    parser.add_argument('--repo_owner', required=True, help='user id of repository owner')
+    parser.add_argument('--repo_name', required=True, help='name of repository')
+    parser.add_argument('--output', required=True, help='directory to write the snapshot to')
+    parser.add_argument('--chunk', action='store_true', help='split documents with a sliding window before embedding')
+    parser.add_argument('--chunk_size', type=int, default=2000, help='sliding window size in characters')
+    parser.add_argument('--chunk_step', type=int, default=1000, help='sliding window step in characters')
+
+    args = parser.parse_args()
+    chunking_params = {'size': args.chunk_size, 'step': args.chunk_step} if args.chunk else None
+    out = build_snapshot(args.repo_owner, args.repo_name, args.output, chunk=args.chunk, chunking_params=chunking_params)
+    print(f"Snapshot written to {out}")